@@ -1,9 +1,37 @@
-from .dht import RpiDht11
-from .relay import RpiRelay
-from .databasemanager import DatabaseManager
-from .ds18 import RpiDs18b20
-from .lcd import RpiLcd1602
-from .mq import RpiMq2
+from importlib import import_module
+
+from .anomaly import AnomalyEvent, AnomalyMonitor, EwmaDetector
+from .clock import SYSTEM_CLOCK, SamplingClock, SystemClock, VirtualClock
+from .control import ControlEngine, Rule, Threshold
+from .pipeline import EnvPipeline, Reading
+from .priority import PRIORITY_ALARM, PRIORITY_BACKGROUND, PRIORITY_NORMAL
+from .replay import ReplayEngine, ReplaySource
+
+# 依赖硬件库（board、gpiozero、w1thermsensor、smbus、spidev 等）的类在首次访问时才导入，
+# 这样在没有这些库的环境中也能使用流水线、回放和控制引擎
+_LAZY = {
+    "RpiDht11": ".dht",
+    "RpiRelay": ".relay",
+    "DatabaseManager": ".databasemanager",
+    "RpiDs18b20": ".ds18",
+    "RpiLcd1602": ".lcd",
+    "RpiMq2": ".mq",
+    "AdcChannel": ".adc",
+    "LinearCalibration": ".adc",
+    "Mcp3008Scanner": ".adc",
+    "MqCalibration": ".adc",
+    "BUS_MANAGER": ".bus",
+    "BusManager": ".bus",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "RpiDht11",
@@ -12,4 +40,27 @@ __all__ = [
     "DatabaseManager",
     "RpiLcd1602",
     "RpiMq2",
+    "AnomalyEvent",
+    "AnomalyMonitor",
+    "EwmaDetector",
+    "SYSTEM_CLOCK",
+    "SamplingClock",
+    "SystemClock",
+    "VirtualClock",
+    "EnvPipeline",
+    "Reading",
+    "ReplayEngine",
+    "ReplaySource",
+    "BUS_MANAGER",
+    "PRIORITY_ALARM",
+    "PRIORITY_BACKGROUND",
+    "PRIORITY_NORMAL",
+    "BusManager",
+    "AdcChannel",
+    "LinearCalibration",
+    "Mcp3008Scanner",
+    "MqCalibration",
+    "ControlEngine",
+    "Rule",
+    "Threshold",
 ]
@@ -0,0 +1,232 @@
+"""
+MCP3008 多通道扫描器。
+
+在一次 SPI 总线事务内连续读取所配置的多个通道（每个通道可单独设置过采样次数），
+以 NumPy 数组返回每轮扫描结果，并按通道名称套用各自的校准，
+用于在同一块 MCP3008 上同时监测多路 MQ 系列气体传感器。
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+from loguru import logger
+
+from .bus import BUS_MANAGER
+from .priority import PRIORITY_NORMAL
+
+# MCP3008 的通道数和满量程读数
+MCP3008_CHANNELS = 8
+MCP3008_MAX = 1023
+
+
+def mcp3008_frame(channel: int) -> list[int]:
+    """
+    构造单端模式下读取指定通道的 SPI 帧。
+
+    :param channel: 通道号 (0-7)
+    :return: 3 字节的 SPI 帧：起始位、单端模式 + 通道号、占位字节
+    """
+    if not 0 <= channel < MCP3008_CHANNELS:
+        raise ValueError("无效的 MCP3008 通道，请使用 0-7")
+    return [0x01, (0x08 | channel) << 4, 0x00]
+
+
+def mcp3008_decode(reply: list[int]) -> int:
+    """从 SPI 返回的 3 字节中取出 10 位转换结果 (0-1023)。"""
+    return ((reply[1] & 0x03) << 8) | reply[2]
+
+
+class LinearCalibration:
+    """线性校准：``value = raw * scale + offset``。"""
+
+    def __init__(self, scale: float = 1.0, offset: float = 0.0):
+        self.scale = scale
+        self.offset = offset
+
+    def __call__(self, raw: float) -> float:
+        return raw * self.scale + self.offset
+
+
+class MqCalibration:
+    """MQ 系列气体传感器的幂律校准。
+
+    根据分压电路计算传感器电阻 Rs，再按数据手册灵敏度曲线的拟合
+    ``ppm = a * (Rs / R0) ** b`` 换算为浓度。
+
+    :param r0: 洁净空气中标定得到的传感器电阻（欧姆）
+    :param a: 灵敏度曲线系数
+    :param b: 灵敏度曲线指数
+    :param load_resistance: 模块上的负载电阻 RL（欧姆），常见模块为 10kΩ
+    :param supply_voltage: 传感器供电电压（伏）
+    :param vref: MCP3008 参考电压（伏），不能高于传感器供电电压
+    :raises ValueError: 当参考电压不在 (0, supply_voltage] 范围内时
+    """
+
+    def __init__(
+        self,
+        r0: float,
+        a: float,
+        b: float,
+        load_resistance: float = 10_000.0,
+        supply_voltage: float = 5.0,
+        vref: float = 3.3,
+    ):
+        if not 0 < vref <= supply_voltage:
+            raise ValueError("vref 必须为正数且不能高于 supply_voltage")
+        self.r0 = r0
+        self.a = a
+        self.b = b
+        self.load_resistance = load_resistance
+        self.supply_voltage = supply_voltage
+        self.vref = vref
+
+    def resistance(self, raw: float) -> float:
+        """
+        由 ADC 读数计算传感器电阻 Rs（欧姆），读数为 0 时返回无穷大。
+
+        输出电压被限制在供电电压以下一个 LSB，ADC 饱和时得到最小的正电阻，
+        而不是 0 或负值。
+        """
+        vout = raw / MCP3008_MAX * self.vref
+        if vout <= 0:
+            return float("inf")
+        vout = min(vout, self.supply_voltage - self.vref / MCP3008_MAX)
+        return self.load_resistance * (self.supply_voltage - vout) / vout
+
+    def __call__(self, raw: float) -> float:
+        return self.a * (self.resistance(raw) / self.r0) ** self.b
+
+
+@dataclass
+class AdcChannel:
+    """扫描器中的一个通道。
+
+    :param channel: MCP3008 通道号 (0-7)
+    :param name: 传感器名称，如 ``"mq2"``、``"mq135"``
+    :param oversample: 每轮扫描的采样次数，结果取平均
+    :param calibration: 原始读数到物理量的换算函数，为 None 时返回原始读数
+    """
+
+    channel: int
+    name: str
+    oversample: int = 1
+    calibration: Optional[Callable[[float], float]] = None
+
+
+class Mcp3008Scanner:
+    """MCP3008 多通道扫描器。
+
+    使用示例:
+    >>> channels = [
+    ...     AdcChannel(0, "mq2", oversample=4),
+    ...     AdcChannel(1, "mq135", oversample=4),
+    ... ]
+    >>> with Mcp3008Scanner(channels) as scanner:
+    ...     raw = scanner.sweep()    # np.ndarray，按 channels 顺序排列
+    ...     values = scanner.read()  # {"mq2": ..., "mq135": ...}
+    """
+
+    def __init__(
+        self,
+        channels: Iterable[AdcChannel],
+        spi_port: int = 0,
+        chip_select: int = 0,
+        bus_manager=BUS_MANAGER,
+        priority: int = PRIORITY_NORMAL,
+    ):
+        """
+        :param channels: 要扫描的通道配置
+        :param spi_port: SPI 端口号
+        :param chip_select: MCP3008 所接的片选
+        :param bus_manager: 总线管理器，默认为进程内共享的管理器
+        :param priority: 扫描事务的总线优先级
+        """
+        self.channels = list(channels)
+        if not self.channels:
+            raise ValueError("至少需要配置一个通道")
+        names = [ch.name for ch in self.channels]
+        if len(set(names)) != len(names):
+            raise ValueError("通道名称不能重复")
+        for ch in self.channels:
+            if ch.oversample < 1:
+                raise ValueError(f"通道 {ch.name} 的过采样次数必须至少为 1")
+
+        # 预先生成整轮扫描的 SPI 帧和各通道在结果中的分段位置
+        self._frames = [
+            mcp3008_frame(ch.channel)
+            for ch in self.channels
+            for _ in range(ch.oversample)
+        ]
+        self._counts = np.array([ch.oversample for ch in self.channels])
+        self._starts = np.concatenate(([0], np.cumsum(self._counts)[:-1]))
+        self.priority = priority
+
+        self.bus_manager = bus_manager
+        self.bus = bus_manager.spi(spi_port)
+        self.device = self.bus.device(chip_select)
+        layout = ", ".join(
+            f"{ch.name}(CH{ch.channel}x{ch.oversample})" for ch in self.channels
+        )
+        logger.info(f"MCP3008 扫描器初始化完成，通道: {layout}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """释放 SPI 总线。"""
+        if self.bus is not None:
+            self.bus_manager.release(self.bus)
+            self.bus = None
+
+    @property
+    def names(self) -> list[str]:
+        """按扫描顺序排列的通道名称。"""
+        return [ch.name for ch in self.channels]
+
+    def sweep(self) -> np.ndarray:
+        """
+        在一次总线事务中连续读取全部通道。
+
+        :return: 各通道过采样平均后的原始读数 (0-1023)，按配置顺序排列
+        """
+        replies = np.asarray(self.device.transfer_many(self._frames, self.priority))
+        raw = ((replies[:, 1] & 0x03) << 8) | replies[:, 2]
+        return np.add.reduceat(raw, self._starts) / self._counts
+
+    def calibrate(self, raw: np.ndarray) -> dict[str, float]:
+        """将一轮扫描结果按各通道的校准换算为物理量。"""
+        return {
+            ch.name: ch.calibration(value) if ch.calibration else value
+            for ch, value in zip(self.channels, raw.tolist())
+        }
+
+    def read(self) -> dict[str, float]:
+        """扫描一轮并返回通道名到校准值的映射。"""
+        return self.calibrate(self.sweep())
+
+
+# 以模块方式运行: python -m devices.adc
+if __name__ == "__main__":
+    import time
+
+    # 灵敏度曲线拟合系数取自各传感器数据手册，R0 需在洁净空气中实际标定
+    gas_channels = [
+        AdcChannel(0, "mq2", 4, MqCalibration(9_800, 3616.1, -2.675)),
+        AdcChannel(1, "mq135", 4, MqCalibration(76_000, 110.47, -2.862)),
+        AdcChannel(2, "mq7", 4, MqCalibration(27_000, 99.042, -1.518)),
+    ]
+    try:
+        with Mcp3008Scanner(gas_channels) as scanner:
+            period = 1 / 50
+            deadline = time.monotonic()
+            while True:
+                logger.info(scanner.read())
+                deadline += period
+                time.sleep(max(0.0, deadline - time.monotonic()))
+    except KeyboardInterrupt:
+        logger.info("用户终止程序")
@@ -0,0 +1,383 @@
+"""
+I2C / SPI 总线管理器。
+
+每条物理总线只打开一次，由 :class:`BusManager` 统一持有，各驱动通过设备句柄访问总线:
+
+- 按优先级串行化访问，报警显示等高优先级事务可以插队到普通刷新之前
+  （以事务为粒度，不会打断正在进行的传输）
+- 同一 I2C 设备排队中的同优先级写操作会被合并为块传输，减少逐字节系统调用；
+  需要执行时间的命令可以作为屏障写入，之后的写入不会与其合并
+- 统计每条总线的事务数、字节数、等待时间和占用率
+
+使用示例:
+>>> lcd_dev = BUS_MANAGER.i2c(1).device(0x27)
+>>> lcd_dev.write([0x0C, 0x08], priority=PRIORITY_ALARM)
+>>> adc_dev = BUS_MANAGER.spi(0).device(0)
+>>> adc_dev.transfer([0x01, 0x80, 0x00])
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from loguru import logger
+
+from .clock import SYSTEM_CLOCK
+from .priority import PRIORITY_NORMAL
+
+if TYPE_CHECKING:
+    import spidev
+
+# SMBus 块写入的最大数据长度（不含首字节）
+I2C_BLOCK_MAX = 32
+
+
+class PriorityLock:
+    """按优先级排队的互斥锁，同优先级按先来先服务。"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._queue: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._held = False
+
+    def acquire(self, priority: int = PRIORITY_NORMAL) -> None:
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._queue, ticket)
+            try:
+                while self._held or self._queue[0] != ticket:
+                    self._cond.wait()
+            except BaseException:
+                # 等待被中断（如 KeyboardInterrupt）时撤回排队，避免队首永远被占住
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self._held = True
+
+    def release(self) -> None:
+        with self._cond:
+            self._held = False
+            self._cond.notify_all()
+
+
+@dataclass
+class BusStats:
+    """单条总线的使用统计。"""
+
+    transactions: int = 0
+    bytes: int = 0
+    coalesced: int = 0
+    wait_seconds: float = 0.0
+    busy_seconds: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def utilization(self) -> float:
+        """总线被占用的时间比例 (0-1)。"""
+        elapsed = time.monotonic() - self.started
+        return self.busy_seconds / elapsed if elapsed > 0 else 0.0
+
+
+class _Bus:
+    """总线公共部分：优先级锁、统计和引用计数。"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = PriorityLock()
+        self.stats = BusStats()
+        self.refs = 0
+
+    @contextmanager
+    def transaction(self, priority: int = PRIORITY_NORMAL) -> Iterator[None]:
+        """
+        独占总线执行一组连续操作。
+
+        :param priority: 事务优先级，数值越小越优先
+        """
+        requested = time.monotonic()
+        self.lock.acquire(priority)
+        acquired = time.monotonic()
+        self.stats.wait_seconds += acquired - requested
+        try:
+            yield
+        finally:
+            self.stats.transactions += 1
+            self.stats.busy_seconds += time.monotonic() - acquired
+            self.lock.release()
+
+
+class _PendingWrite:
+    __slots__ = ("data", "settle", "done", "error")
+
+    def __init__(self, data: list[int], settle: float = 0.0):
+        self.data = data
+        self.settle = settle
+        self.done = False
+        self.error: Exception | None = None
+
+
+class I2CBus(_Bus):
+    """一条 I2C 总线。
+
+    写操作采用合并提交：线程先把数据放入对应设备、对应优先级的待写队列再排队获取总线，
+    获得总线的线程会把该队列中的数据一次性写出，其余线程发现自己的数据已被写出后直接返回。
+    只合并同优先级的写入，高优先级写入由优先级锁保证先于排队中的普通写入发出。
+    带 ``settle`` 的写入是屏障：合并只到屏障为止，写出后在持有总线的情况下等待
+    ``settle`` 秒，之后排队的写入留待下一批发送。
+    块写入把字节按原样依次发送，适用于 PCF8574 这类没有寄存器地址的 I/O 扩展器。
+
+    :param bus_num: I2C总线编号
+    :param clock: 时钟对象，用于屏障写入后的等待
+    :param smbus_device: 已打开的 SMBus 对象，默认打开 ``/dev/i2c-<bus_num>``，
+        自检时可传入记录写入内容的替身
+    """
+
+    def __init__(self, bus_num: int, clock=SYSTEM_CLOCK, smbus_device=None):
+        super().__init__(f"i2c-{bus_num}")
+        self.bus_num = bus_num
+        self.clock = clock
+        if smbus_device is None:
+            import smbus
+
+            smbus_device = smbus.SMBus(bus_num)
+        self.smbus = smbus_device
+        self._mutex = threading.Lock()
+        self._pending: dict[tuple[int, int], list[_PendingWrite]] = {}
+
+    def device(self, address: int) -> "I2CDevice":
+        """返回指定地址的设备句柄。"""
+        return I2CDevice(self, address)
+
+    def write(
+        self,
+        address: int,
+        data: Iterable[int],
+        priority: int = PRIORITY_NORMAL,
+        settle: float = 0.0,
+    ) -> None:
+        """
+        向设备写入字节序列，与同一设备、同优先级的其他排队写入合并发送。
+
+        :param address: 设备I2C地址
+        :param data: 要写入的字节序列
+        :param priority: 事务优先级
+        :param settle: 写出后继续占用总线等待的时间（秒），用于需要执行时间的命令；
+            大于 0 时该写入作为屏障，之后排队的写入不会与其合并
+        :raises OSError: 当I2C传输失败时
+        """
+        request = _PendingWrite(list(data), settle)
+        key = (address, priority)
+        with self._mutex:
+            self._pending.setdefault(key, []).append(request)
+
+        with self.transaction(priority):
+            while not request.done:
+                self._flush(address, key)
+
+        if request.error is not None:
+            raise request.error
+
+    def _flush(self, address: int, key: tuple[int, int]) -> None:
+        """在已持有总线的前提下写出队列中的一批数据，批次到第一个屏障写入为止。"""
+        with self._mutex:
+            queue = self._pending[key]
+            end = next(
+                (i + 1 for i, pending in enumerate(queue) if pending.settle > 0),
+                len(queue),
+            )
+            batch = queue[:end]
+            del queue[:end]
+            if not queue:
+                del self._pending[key]
+        payload = [byte for pending in batch for byte in pending.data]
+        try:
+            self._write_block(address, payload)
+            self.clock.sleep(batch[-1].settle)
+        except OSError as e:
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done = True
+        self.stats.coalesced += len(batch) - 1
+
+    def _write_block(self, address: int, payload: list[int]) -> None:
+        """按 SMBus 块长度限制分段写出。"""
+        for start in range(0, len(payload), I2C_BLOCK_MAX + 1):
+            chunk = payload[start : start + I2C_BLOCK_MAX + 1]
+            if len(chunk) == 1:
+                self.smbus.write_byte(address, chunk[0])
+            else:
+                self.smbus.write_i2c_block_data(address, chunk[0], chunk[1:])
+        self.stats.bytes += len(payload)
+
+    def read_byte(self, address: int, priority: int = PRIORITY_NORMAL) -> int:
+        """从设备读取一个字节。"""
+        with self.transaction(priority):
+            value = self.smbus.read_byte(address)
+            self.stats.bytes += 1
+        return value
+
+    def close(self) -> None:
+        self.smbus.close()
+
+
+class I2CDevice:
+    """I2C 设备句柄，由 :meth:`I2CBus.device` 创建。"""
+
+    def __init__(self, bus: I2CBus, address: int):
+        self.bus = bus
+        self.address = address
+
+    def write(
+        self,
+        data: Iterable[int],
+        priority: int = PRIORITY_NORMAL,
+        settle: float = 0.0,
+    ) -> None:
+        """写入字节序列，见 :meth:`I2CBus.write`。"""
+        self.bus.write(self.address, data, priority, settle)
+
+    def write_byte(self, value: int, priority: int = PRIORITY_NORMAL) -> None:
+        """写入单个字节。"""
+        self.bus.write(self.address, (value,), priority)
+
+    def read_byte(self, priority: int = PRIORITY_NORMAL) -> int:
+        """读取单个字节。"""
+        return self.bus.read_byte(self.address, priority)
+
+
+class SPIBus(_Bus):
+    """一条 SPI 总线，多个片选共享同一把优先级锁。
+
+    SPI 为全双工传输，每次传输都需要读取返回数据，因此不做写合并；
+    需要连续多次传输的驱动应在 :meth:`transaction` 中一次性完成。
+
+    :param port: SPI端口号，树莓派上通常为0
+    :param max_speed_hz: SPI时钟频率
+    :param spi_devices: 片选号到已打开的 SpiDev 对象的映射，未给出的片选在首次使用时打开，
+        自检时可传入模拟 ADC 返回数据的替身
+    """
+
+    def __init__(
+        self,
+        port: int,
+        max_speed_hz: int = 1_000_000,
+        spi_devices: dict[int, "spidev.SpiDev"] | None = None,
+    ):
+        super().__init__(f"spi-{port}")
+        self.port = port
+        self.max_speed_hz = max_speed_hz
+        self._devices: dict[int, "spidev.SpiDev"] = dict(spi_devices or {})
+
+    def device(self, chip_select: int) -> "SPIDevice":
+        """返回指定片选的设备句柄，同一片选只打开一次。"""
+        if chip_select not in self._devices:
+            import spidev
+
+            spi = spidev.SpiDev()
+            spi.open(self.port, chip_select)
+            spi.max_speed_hz = self.max_speed_hz
+            self._devices[chip_select] = spi
+        return SPIDevice(self, chip_select)
+
+    def _transfer(self, chip_select: int, data: list[int]) -> list[int]:
+        """在已持有总线的前提下执行一次传输。"""
+        result = self._devices[chip_select].xfer2(data)
+        self.stats.bytes += len(data)
+        return result
+
+    def close(self) -> None:
+        for spi in self._devices.values():
+            spi.close()
+        self._devices.clear()
+
+
+class SPIDevice:
+    """SPI 设备句柄，由 :meth:`SPIBus.device` 创建。"""
+
+    def __init__(self, bus: SPIBus, chip_select: int):
+        self.bus = bus
+        self.chip_select = chip_select
+
+    def transfer(
+        self, data: Iterable[int], priority: int = PRIORITY_NORMAL
+    ) -> list[int]:
+        """执行一次独立的全双工传输并返回读到的字节。"""
+        with self.bus.transaction(priority):
+            return self.bus._transfer(self.chip_select, list(data))
+
+    def transfer_many(
+        self, frames: Iterable[Iterable[int]], priority: int = PRIORITY_NORMAL
+    ) -> list[list[int]]:
+        """
+        在一次总线事务中连续执行多次传输，每帧之间片选会释放一次。
+
+        :param frames: 每次传输的字节序列
+        :return: 每次传输读到的字节
+        """
+        with self.bus.transaction(priority):
+            return [
+                self.bus._transfer(self.chip_select, list(frame)) for frame in frames
+            ]
+
+
+class BusManager:
+    """持有全部 I2C / SPI 总线的管理器，总线在首次请求时打开。
+
+    驱动通过 :meth:`i2c` / :meth:`spi` 获取总线并在关闭时调用 :meth:`release`，
+    最后一个使用者释放后底层总线才会关闭。
+
+    :param clock: 时钟对象，传给各总线用于屏障写入后的等待
+    """
+
+    def __init__(self, clock=SYSTEM_CLOCK):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buses: dict[tuple[str, int], _Bus] = {}
+
+    def i2c(self, bus_num: int = 1) -> I2CBus:
+        """获取I2C总线。"""
+        return self._acquire(("i2c", bus_num), lambda: I2CBus(bus_num, self.clock))
+
+    def spi(self, port: int = 0) -> SPIBus:
+        """获取SPI总线。"""
+        return self._acquire(("spi", port), lambda: SPIBus(port))
+
+    def _acquire(self, key, factory):
+        with self._lock:
+            bus = self._buses.get(key)
+            if bus is None:
+                bus = factory()
+                self._buses[key] = bus
+                logger.info(f"总线 {bus.name} 已打开")
+            bus.refs += 1
+            return bus
+
+    def release(self, bus: _Bus) -> None:
+        """释放一次总线引用，引用归零时关闭总线。"""
+        with self._lock:
+            bus.refs -= 1
+            if bus.refs > 0:
+                return
+            for key, value in list(self._buses.items()):
+                if value is bus:
+                    del self._buses[key]
+            bus.close()
+            logger.info(f"总线 {bus.name} 已关闭")
+
+    def stats(self) -> dict[str, BusStats]:
+        """返回每条已打开总线的使用统计。"""
+        with self._lock:
+            return {bus.name: bus.stats for bus in self._buses.values()}
+
+
+# 进程内共享的总线管理器
+BUS_MANAGER = BusManager()
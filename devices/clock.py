@@ -0,0 +1,180 @@
+"""
+可注入的时钟抽象。
+
+主循环和各驱动不直接调用 ``time.sleep`` / ``time.time``，而是通过时钟对象访问时间，
+从而可以在回放测试中用 :class:`VirtualClock` 替换真实时钟，以远高于实时的速度运行。
+"""
+
+import time
+
+
+class SystemClock:
+    """基于系统时间的真实时钟。"""
+
+    def time(self) -> float:
+        """返回当前墙上时间（Unix 时间戳，秒）。"""
+        return time.time()
+
+    def monotonic(self) -> float:
+        """返回单调时钟读数（秒），用于计算时间间隔。"""
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        """阻塞等待指定秒数。"""
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """虚拟时钟，``sleep`` 只推进内部时间而不真正等待。
+
+    使用示例:
+    >>> clock = VirtualClock(start=1_700_000_000.0)
+    >>> clock.sleep(2)
+    >>> clock.time()
+    1700000002.0
+
+    :param start: 初始墙上时间（Unix 时间戳，秒）
+    :param speed: 回放倍速，为 None 时不做任何真实等待；
+        例如 1000 表示虚拟时间每前进 1000 秒真实等待 1 秒
+    """
+
+    def __init__(self, start: float = 0.0, speed: float | None = None):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed 必须为正数")
+        self._start = start
+        self._now = start
+        self.speed = speed
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now - self._start
+
+    def sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        self._now += seconds
+        if self.speed is not None:
+            time.sleep(seconds / self.speed)
+
+    def reset(self, start: float) -> None:
+        """将时钟重置到指定墙上时间，单调时钟读数归零。"""
+        self._start = start
+        self._now = start
+
+    def advance_to(self, timestamp: float) -> None:
+        """
+        将时钟推进到指定墙上时间，用于按记录的时间戳回放数据。
+
+        时间只会向前推进，早于当前时间的时间戳会被忽略。
+        """
+        self.sleep(timestamp - self._now)
+
+
+# 默认使用的真实时钟实例
+SYSTEM_CLOCK = SystemClock()
+
+
+class SamplingClock:
+    """按绝对单调时钟截止时间调度的采样时钟，避免"工作耗时 + sleep"造成的周期漂移。
+
+    第 n 次采样的截止时间固定为 ``起始时间 + n * period``。若某次处理超过截止时间，
+    记为一次超时并跳过已错过的采样点，直接对齐到下一个未来的截止时间；
+    恰好在截止时间完成的处理不算超时。
+
+    使用示例:
+    >>> sampler = SamplingClock(2.0)
+    >>> for tick in sampler:
+    ...     reading = read_sensors()
+    ...     if tick % 100 == 0:
+    ...         logger.info(sampler.stats())
+
+    :param period: 采样周期（秒）
+    :param clock: 时钟对象，默认为系统时钟
+    """
+
+    def __init__(self, period: float, clock=SYSTEM_CLOCK):
+        if period <= 0:
+            raise ValueError("period 必须为正数")
+        self.period = period
+        self.clock = clock
+        self._start: float | None = None
+        self.tick = 0
+        self.overruns = 0
+        self.skipped = 0
+        self._reset_jitter()
+
+    def _reset_jitter(self) -> None:
+        self._late_count = 0
+        self._late_mean = 0.0
+        self._late_m2 = 0.0
+        self.max_lateness = 0.0
+
+    def start(self) -> None:
+        """以当前时刻作为第 0 个采样点重新开始计时，并清空统计。"""
+        self._start = self.clock.monotonic()
+        self.tick = 0
+        self.overruns = 0
+        self.skipped = 0
+        self._reset_jitter()
+
+    def wait(self) -> int:
+        """
+        等待到下一个采样点。
+
+        :return: 采样点序号，跳过采样点时序号不连续
+        """
+        if self._start is None:
+            self.start()
+            return self.tick
+
+        self.tick += 1
+        deadline = self._start + self.tick * self.period
+        now = self.clock.monotonic()
+        if now > deadline:
+            self.overruns += 1
+            next_tick = int((now - self._start) // self.period) + 1
+            self.skipped += next_tick - self.tick
+            self.tick = next_tick
+            deadline = self._start + self.tick * self.period
+
+        self.clock.sleep(deadline - self.clock.monotonic())
+        self._record_lateness(self.clock.monotonic() - deadline)
+        return self.tick
+
+    def _record_lateness(self, lateness: float) -> None:
+        """Welford 算法增量统计唤醒时刻相对截止时间的延迟。"""
+        self._late_count += 1
+        delta = lateness - self._late_mean
+        self._late_mean += delta / self._late_count
+        self._late_m2 += delta * (lateness - self._late_mean)
+        self.max_lateness = max(self.max_lateness, lateness)
+
+    def __iter__(self):
+        """依次产出采样点序号，第 0 个采样点立即开始。"""
+        self.start()
+        yield self.tick
+        while True:
+            yield self.wait()
+
+    def stats(self) -> dict[str, float]:
+        """
+        返回调度统计：经过的采样点数、实际采样次数、超时次数、跳过的采样点数，
+        以及唤醒延迟（抖动）的均值、标准差和最大值（秒）。
+        """
+        std = (
+            (self._late_m2 / (self._late_count - 1)) ** 0.5
+            if self._late_count > 1
+            else 0.0
+        )
+        return {
+            "ticks": self.tick + 1,
+            "samples": self.tick + 1 - self.skipped,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter_mean": self._late_mean,
+            "jitter_std": std,
+            "jitter_max": self.max_lateness,
+        }
@@ -0,0 +1,264 @@
+"""
+事件驱动的继电器控制引擎。
+
+引擎订阅通过异常检测的读数更新（见 :meth:`EnvPipeline.subscribe`），
+每收到一次更新立即评估声明式规则并驱动继电器：
+
+- :class:`Threshold`：对一个或多个通道（取最大/最小值）做带滞回的阈值判断
+- :class:`Rule`：若干阈值的“全部满足”或“任一满足”组合，任一规则成立即开启继电器
+- 最短开启/关闭保持时间，防止继电器在设定点附近频繁抖动
+- 参与规则的读数过期时进入预设的失效安全状态（按读数到达引擎的时刻判断是否过期）
+
+同时记录切换次数和从收到更新到完成驱动的延迟，便于用回放数据调参。
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Mapping, Optional
+
+from loguru import logger
+
+from .clock import SYSTEM_CLOCK
+
+
+@dataclass
+class Threshold:
+    """带滞回的阈值条件。
+
+    以 ``below=False`` 为例：读数超过 ``level`` 时成立，成立后需回落到
+    ``level - hysteresis`` 以下才解除。多个通道时取最大值（``below=True`` 时取最小值），
+    即“任一传感器超限”即成立。
+
+    :param channels: 参与判断的通道名称
+    :param level: 阈值
+    :param hysteresis: 滞回宽度
+    :param below: 为 True 时读数低于阈值成立（例如加热控制）
+    """
+
+    channels: tuple[str, ...]
+    level: float
+    hysteresis: float = 0.0
+    below: bool = False
+    active: bool = field(default=False, init=False)
+
+    def evaluate(self, values: Mapping[str, float]) -> Optional[bool]:
+        """
+        根据最新读数更新并返回条件状态。
+
+        :param values: 未过期的通道读数
+        :return: 条件是否成立，所有通道都没有有效读数时返回 None
+        """
+        readings = [values[ch] for ch in self.channels if ch in values]
+        if not readings:
+            return None
+        if self.below:
+            value = min(readings)
+            limit = self.level + self.hysteresis if self.active else self.level
+            self.active = value < limit
+        else:
+            value = max(readings)
+            limit = self.level - self.hysteresis if self.active else self.level
+            self.active = value > limit
+        return self.active
+
+
+@dataclass
+class Rule:
+    """由若干阈值组合而成的控制规则。
+
+    使用示例（任一温度传感器超过 30°C 且烟雾读数超过 300 时开启）:
+    >>> Rule(
+    ...     "hot_and_smoky",
+    ...     [
+    ...         Threshold(("dht_temperature", "ds18_temperature"), 30, hysteresis=1),
+    ...         Threshold(("mq2",), 300, hysteresis=20),
+    ...     ],
+    ...     require_all=True,
+    ... )
+
+    :param name: 规则名称，用于日志
+    :param thresholds: 阈值条件
+    :param require_all: True 表示全部成立才成立，False 表示任一成立即成立
+    """
+
+    name: str
+    thresholds: list[Threshold]
+    require_all: bool = False
+
+    @property
+    def channels(self) -> set[str]:
+        """规则用到的全部通道。"""
+        return {ch for threshold in self.thresholds for ch in threshold.channels}
+
+    def evaluate(self, values: Mapping[str, float]) -> Optional[bool]:
+        """
+        评估规则，无法确定时返回 None。
+
+        “全部满足”时任一条件不成立即为 False，否则只要有条件缺少读数即为 None；
+        “任一满足”时任一条件成立即为 True，否则只要有条件缺少读数即为 None。
+        """
+        results = [threshold.evaluate(values) for threshold in self.thresholds]
+        decisive = False if self.require_all else True
+        if decisive in results:
+            return decisive
+        if None in results:
+            return None
+        return not decisive
+
+
+def default_rules() -> list[Rule]:
+    """
+    与原主循环逻辑对应的默认规则：任一温度传感器高于 25°C，
+    或温度、烟雾读数出现向上偏离的环境异常报警时开启继电器（见 ``ALARM_CHANNELS``）。
+    """
+    return [
+        Rule(
+            "overheat",
+            [Threshold(("dht_temperature", "ds18_temperature"), 25.0, hysteresis=0.5)],
+        ),
+        Rule("anomaly", [Threshold(("anomaly",), 0.5)]),
+    ]
+
+
+class ControlEngine:
+    """继电器控制引擎。
+
+    使用示例:
+    >>> engine = ControlEngine(relay, default_rules(), min_on=30, min_off=30)
+    >>> pipeline.subscribe(engine.update)
+
+    :param relay: 继电器，接口同 :class:`RpiRelay`
+    :param rules: 控制规则，默认为 :func:`default_rules`
+    :param clock: 时钟对象，其单调时钟用于判断保持时间和读数是否过期
+    :param min_on: 开启后的最短保持时间（秒）
+    :param min_off: 关闭后的最短保持时间（秒）
+    :param stale_after: 读数超过此时长（秒）未更新即视为过期，应大于一轮采集的最长耗时
+        （DS18B20 出错后等待 10 秒，DHT11 重试约 2 秒）
+    :param fail_safe: 规则因读数过期或故障无法判断时继电器应处的状态；
+        启动后规则所需的通道尚未收到过读数时保持当前状态
+    """
+
+    def __init__(
+        self,
+        relay,
+        rules: Iterable[Rule] | None = None,
+        clock=SYSTEM_CLOCK,
+        min_on: float = 30.0,
+        min_off: float = 30.0,
+        stale_after: float = 30.0,
+        fail_safe: bool = False,
+    ):
+        self.relay = relay
+        self.rules = list(rules) if rules is not None else default_rules()
+        self.clock = clock
+        self.min_on = min_on
+        self.min_off = min_off
+        self.stale_after = stale_after
+        self.fail_safe = fail_safe
+
+        self._lock = threading.Lock()
+        self._values: dict[str, tuple[float, float]] = {}
+        self._seen: set[str] = set()
+        self._last_switch: Optional[float] = None
+
+        self.switches = 0
+        self.held_by_dwell = 0
+        self.fail_safe_decisions = 0
+        self.actuations = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def update(self, values: Mapping[str, Optional[float]]) -> bool:
+        """
+        接收部分或全部通道的新读数，立即评估规则并驱动继电器。
+
+        值为 None 的通道（读取失败或被判定为故障）会清除其上一次读数，
+        不再参与规则判断。读数按到达时刻记录，不使用一轮采集开始的时刻，
+        因此被阻塞读取（如 DS18B20 出错后的等待）拖长的一轮不会使已读到的读数过期。
+        到达时刻和保持时间均使用单调时钟，不受 NTP 校时造成的墙上时间跳变影响。
+
+        :param values: 通道名到读数的映射
+        :return: 评估后的继电器状态
+        """
+        received = time.perf_counter()
+        timestamp = self.clock.monotonic()
+        with self._lock:
+            for channel, value in values.items():
+                if value is None:
+                    self._values.pop(channel, None)
+                else:
+                    self._values[channel] = (float(value), timestamp)
+                    self._seen.add(channel)
+            return self._evaluate(received)
+
+    def tick(self) -> bool:
+        """
+        在没有新读数时重新评估，用于让过期判断和保持时间到期及时生效。
+
+        :return: 评估后的继电器状态
+        """
+        with self._lock:
+            return self._evaluate(time.perf_counter())
+
+    def _evaluate(self, received: float) -> bool:
+        now = self.clock.monotonic()
+        fresh = {
+            channel: value
+            for channel, (value, stamp) in self._values.items()
+            if now - stamp <= self.stale_after
+        }
+        results = [rule.evaluate(fresh) for rule in self.rules]
+        if True in results:
+            desired = True
+        elif None in results:
+            if any(
+                not rule.channels & self._seen
+                for rule, result in zip(self.rules, results)
+                if result is None
+            ):
+                # 启动后规则所需的读数尚未到达，保持当前状态
+                return self.relay.is_on
+            desired = self.fail_safe
+            self.fail_safe_decisions += 1
+        else:
+            desired = False
+
+        if desired == self.relay.is_on:
+            return desired
+
+        if self._last_switch is not None:
+            dwell = self.min_on if self.relay.is_on else self.min_off
+            if now - self._last_switch < dwell:
+                self.held_by_dwell += 1
+                return self.relay.is_on
+
+        if desired:
+            self.relay.on()
+        else:
+            self.relay.off()
+        self._last_switch = now
+        self.switches += 1
+
+        latency = time.perf_counter() - received
+        self.actuations += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        active = [rule.name for rule, result in zip(self.rules, results) if result]
+        logger.info(
+            f"继电器{'开启' if desired else '关闭'}，触发规则: {active or '无'}，"
+            f"驱动延迟 {latency * 1000:.2f} ms"
+        )
+        return desired
+
+    def stats(self) -> dict[str, float]:
+        """返回切换次数、被保持时间抑制的次数、失效安全判定次数和驱动延迟（秒）。"""
+        return {
+            "switches": self.switches,
+            "held_by_dwell": self.held_by_dwell,
+            "fail_safe_decisions": self.fail_safe_decisions,
+            "latency_mean": (
+                self.latency_total / self.actuations if self.actuations else 0.0
+            ),
+            "latency_max": self.latency_max,
+        }
@@ -1,9 +1,32 @@
 import pymysql
+import pymysql.cursors
 from pymysql import MySQLError
 from loguru import logger
 from tenacity import retry, stop_after_attempt
 from dotenv import load_dotenv
 import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+# 数据库会话使用的时区，timestamp 列中的时间均按此时区存储
+DB_TIMEZONE = timezone(timedelta(hours=8))
+DB_TIMEZONE_OFFSET = "+08:00"
+
+
+def to_db_datetime(timestamp: datetime | float) -> datetime:
+    """
+    将 Unix 时间戳或带时区的 datetime 转换为数据库时区下的 naive datetime，保留微秒。
+
+    :param timestamp: Unix 时间戳（秒）或 datetime，naive datetime 视为已在数据库时区下
+    :type timestamp: datetime | float
+    :return: 可直接写入 DATETIME(6) 列的时间
+    :rtype: datetime
+    """
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            return timestamp
+        return timestamp.astimezone(DB_TIMEZONE).replace(tzinfo=None)
+    return datetime.fromtimestamp(timestamp, DB_TIMEZONE).replace(tzinfo=None)
 
 
 class DatabaseManager:
@@ -65,7 +88,7 @@ class DatabaseManager:
             read_timeout=5,
             write_timeout=5,
             autocommit=True,
-            init_command="SET time_zone = '+08:00'",
+            init_command=f"SET time_zone = '{DB_TIMEZONE_OFFSET}'",
         )
 
     def initialize(self):
@@ -73,6 +96,7 @@ class DatabaseManager:
         初始化数据库和数据表。
 
         此方法会创建数据库（如果不存在）和数据表（如果不存在）。
+        旧版本创建的表中 timestamp 列只有秒级精度，会被升级为 DATETIME(6)。
         在执行数据操作前，应显式调用此方法。
         """
         logger.info(
@@ -92,13 +116,32 @@ class DatabaseManager:
                     create_table_sql = f"""
                         CREATE TABLE IF NOT EXISTS `{self.table_name}` (
                             id INT AUTO_INCREMENT PRIMARY KEY,
-                            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                            timestamp DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
                             temperature FLOAT,
                             humidity FLOAT,
                             ppm FLOAT
                         )
                     """
                     cursor.execute(create_table_sql)
+
+                    # 升级旧表的时间精度
+                    cursor.execute(
+                        """
+                        SELECT DATETIME_PRECISION FROM information_schema.COLUMNS
+                        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+                            AND COLUMN_NAME = 'timestamp'
+                        """,
+                        (self.database_name, self.table_name),
+                    )
+                    row = cursor.fetchone()
+                    if row is not None and row[0] != 6:
+                        logger.info("正在将 timestamp 列升级为微秒精度...")
+                        cursor.execute(
+                            f"""
+                            ALTER TABLE `{self.table_name}` MODIFY COLUMN
+                            timestamp DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6)
+                            """
+                        )
             logger.success("数据库初始化成功")
         except MySQLError as e:
             logger.error(f"数据库初始化失败: {e}")
@@ -109,27 +152,42 @@ class DatabaseManager:
         temp: float | int | None = None,
         humid: float | int | None = None,
         ppm: float | None = None,
+        timestamp: datetime | float | None = None,
     ):
         """
         将环境数据（温度、湿度和烟雾浓度）插入到数据表中。
         如果某个参数为 None，则该字段在数据库中将被记为 NULL。
 
+        应传入采集时刻的 ``timestamp``，这样缓冲或延迟写入时记录的仍是采集时间；
+        未传入时由数据库在写入时刻填充。
+
         :param temp: 温度值，默认为 None
         :type temp: float | int | None
         :param humid: 湿度值，默认为 None
         :type humid: float | int | None
         :param ppm: 烟雾浓度值，默认为 None
         :type ppm: float | None
+        :param timestamp: 采集时间（Unix 时间戳或 datetime），精确到微秒，默认为 None
+        :type timestamp: datetime | float | None
         :raises MySQLError: 当数据库操作失败时
         """
         try:
             with self._get_connection(self.database_name) as connection:
                 with connection.cursor() as cursor:
-                    sql = f"""
-                        INSERT INTO `{self.table_name}` (temperature, humidity, ppm) VALUES (%s, %s, %s)
-                    """
-                    cursor.execute(sql, (temp, humid, ppm))
-                    logger.info(f"成功插入数据: 温度={temp}, 湿度={humid}, ppm={ppm}")
+                    if timestamp is None:
+                        sql = f"""
+                            INSERT INTO `{self.table_name}` (temperature, humidity, ppm) VALUES (%s, %s, %s)
+                        """
+                        cursor.execute(sql, (temp, humid, ppm))
+                    else:
+                        timestamp = to_db_datetime(timestamp)
+                        sql = f"""
+                            INSERT INTO `{self.table_name}` (timestamp, temperature, humidity, ppm) VALUES (%s, %s, %s, %s)
+                        """
+                        cursor.execute(sql, (timestamp, temp, humid, ppm))
+                    logger.info(
+                        f"成功插入数据: 时间={timestamp}, 温度={temp}, 湿度={humid}, ppm={ppm}"
+                    )
         except MySQLError as e:
             logger.error(f"MySQL 错误: 数据插入失败 - {e}")
             raise
@@ -137,6 +195,51 @@ class DatabaseManager:
             logger.exception(f"未知错误导致插入失败: {e}")
             raise
 
+    def fetch_env_data(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> Iterator[dict]:
+        """
+        按时间顺序逐行查询环境数据，主要用于历史数据回放。
+
+        使用无缓冲游标流式读取，一个月的数据也不会一次性载入内存；
+        迭代结束或中途停止时关闭连接。
+
+        :param start: 起始时间（含），默认为 None 表示不限制
+        :type start: datetime | None
+        :param end: 结束时间（不含），默认为 None 表示不限制
+        :type end: datetime | None
+        :return: 行字典迭代器，键为 timestamp、temperature、humidity、ppm
+        :rtype: Iterator[dict]
+        :raises MySQLError: 当数据库操作失败时
+        """
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("timestamp >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("timestamp < %s")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = 0
+        try:
+            with self._get_connection(self.database_name) as connection:
+                with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+                    sql = f"""
+                        SELECT timestamp, temperature, humidity, ppm FROM `{self.table_name}`
+                        {where} ORDER BY timestamp, id
+                    """
+                    cursor.execute(sql, params)
+                    for row in cursor:
+                        rows += 1
+                        yield row
+            logger.info(f"查询到 {rows} 条环境数据")
+        except MySQLError as e:
+            logger.error(f"MySQL 错误: 数据查询失败 - {e}")
+            raise
+
 
 if __name__ == "__main__":
     # 配置数据库连接参数
@@ -158,8 +261,10 @@ if __name__ == "__main__":
         # 显式初始化数据库和表
         db_manager.initialize()
 
-        # 插入完整数据
-        db_manager.insert_env_data(temp=23.5, humid=45, ppm=120)
+        # 插入完整数据，附带采集时间
+        db_manager.insert_env_data(
+            temp=23.5, humid=45, ppm=120, timestamp=datetime.now(DB_TIMEZONE)
+        )
 
         # 插入部分数据，ppm将为NULL
         db_manager.insert_env_data(temp=24.1, humid=44.2)
@@ -4,6 +4,8 @@ import adafruit_dht
 from loguru import logger
 from typing import Optional, Tuple
 
+from .clock import SYSTEM_CLOCK
+
 
 class RpiDht11:
     """Raspberry Pi DHT11温湿度传感器控制器
@@ -24,6 +26,7 @@ class RpiDht11:
         pin=board.D14,
         max_retries: int = 3,
         retry_delay: float = 1.0,
+        clock=SYSTEM_CLOCK,
     ):
         """初始化DHT11传感器
 
@@ -31,10 +34,12 @@ class RpiDht11:
         :param pin: GPIO引脚，使用board库定义的引脚名
         :param  max_retries: 读取失败时的最大重试次数
         :param  retry_delay: 重试之间的延迟（秒）
+        :param  clock: 时钟对象，默认为系统时钟，回放测试时可替换为虚拟时钟
         """
         self.pin = pin
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.clock = clock
         self.sensor = adafruit_dht.DHT11(self.pin)
         logger.info(f"DHT11传感器初始化: GPIO{pin}")
 
@@ -78,13 +83,14 @@ class RpiDht11:
                 )
 
             if attempt < self.max_retries - 1:
-                time.sleep(self.retry_delay)
+                self.clock.sleep(self.retry_delay)
 
         logger.error("多次尝试后仍无法读取传感器数据")
         return None, None
 
 
 # 测试
+# 以模块方式运行: python -m devices.dht
 if __name__ == "__main__":
     try:
         with RpiDht11(board.D23) as dht11:
@@ -3,10 +3,16 @@ from loguru import logger
 from w1thermsensor import W1ThermSensor
 from w1thermsensor.errors import NoSensorFoundError, SensorNotReadyError
 
+from .clock import SYSTEM_CLOCK
+
 
 class RpiDs18b20:
-    def __init__(self):
+    def __init__(self, clock=SYSTEM_CLOCK):
+        """
+        :param clock: 时钟对象，默认为系统时钟，回放测试时可替换为虚拟时钟
+        """
         self.sensor = None
+        self.clock = clock
         logger.info("正在初始化 DS18B20 传感器...")
         self._initialize_sensor()
 
@@ -40,13 +46,14 @@ class RpiDs18b20:
             return temperature
         except SensorNotReadyError:
             logger.warning("DS18B20传感器尚未就绪，正在重试...")
-            time.sleep(1)
+            self.clock.sleep(1)
         except Exception as e:
             logger.error(f"DS18B20读取温度时发生错误: {e}")
-            time.sleep(10)
+            self.clock.sleep(10)
         return None
 
 
+# 以模块方式运行: python -m devices.ds18
 if __name__ == "__main__":
     with RpiDs18b20() as ds18b20:
         try:
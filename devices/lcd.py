@@ -1,17 +1,32 @@
 import time
-import smbus
+
+from .bus import BUS_MANAGER
+from .priority import PRIORITY_NORMAL
 
 
 class RpiLcd1602:
     """
     用于通过I2C接口控制LCD1602显示器的类。
     该类封装了与基于PCF8574 I/O扩展器的I2C LCD模块进行通信所需的所有功能。
+
+    I2C总线由 :class:`BusManager` 统一管理，多块显示器可共享同一条总线。
+    每条命令或每次写入的整段字符串会被编码为一个字节序列，以块传输方式一次写出；
+    报警信息可以通过 ``priority`` 参数插队到普通刷新之前。
+    需要执行时间的命令（初始化序列、清屏）作为屏障写入，执行期间保持占用总线，
+    不会与之后的写入合并。
     """
 
     # I2C设备默认地址
     DEFAULT_ADDRESS = 0x27
 
-    def __init__(self, address=DEFAULT_ADDRESS, backlight_on=True, bus_num=1):
+    def __init__(
+        self,
+        address=DEFAULT_ADDRESS,
+        backlight_on=True,
+        bus_num=1,
+        bus_manager=BUS_MANAGER,
+        priority=PRIORITY_NORMAL,
+    ):
         """
         初始化LCD1602显示器。
 
@@ -21,10 +36,17 @@ class RpiLcd1602:
         :type backlight_on: bool
         :param bus_num: I2C总线编号，通常为1。
         :type bus_num: int
+        :param bus_manager: 总线管理器，默认为进程内共享的管理器。
+        :type bus_manager: BusManager
+        :param priority: 默认的总线事务优先级，数值越小越优先。
+        :type priority: int
         """
         self.addr = address
-        self.bus = smbus.SMBus(bus_num)
+        self.bus_manager = bus_manager
+        self.bus = bus_manager.i2c(bus_num)
+        self.device = self.bus.device(address)
         self.backlight_on = backlight_on
+        self.priority = priority
 
         try:
             self._init_display()
@@ -32,86 +54,65 @@ class RpiLcd1602:
             self.close()
             raise IOError(f"LCD初始化失败: {e}")
 
-    def _write_word(self, data):
+    def _encode(self, value, mode):
         """
-        向I2C设备写入一个字节数据，并根据背光状态设置控制位。
+        将一个字节按4位数据模式编码为写入PCF8574的字节序列。
+        每4位对应一次使能脉冲（EN=1 后 EN=0），并根据背光状态设置控制位。
+        I2C每字节的传输时间已远大于HD44780要求的使能脉冲宽度，无需额外延时。
         这是一个内部辅助方法。
 
-        :param data: 要写入的字节数据。
-        :type data: int
+        :param value: 要发送的命令或字符数据。
+        :type value: int
+        :param mode: 0x00表示命令（RS=0），0x01表示数据（RS=1）。
+        :type mode: int
+        :return: 待写入的字节列表。
+        :rtype: list[int]
         """
-        if self.backlight_on:
-            data |= 0x08  # 设置背光开启位
-        else:
-            data &= 0xF7  # 设置背光关闭位
-        self.bus.write_byte(self.addr, data)
-
-    def _send_command(self, comm):
+        backlight = 0x08 if self.backlight_on else 0x00  # 背光控制位
+        frames = []
+        for nibble in (value & 0xF0, (value & 0x0F) << 4):
+            buf = nibble | mode | backlight
+            frames.append(buf | 0x04)  # EN=1
+            frames.append(buf & 0xFB)  # EN=0
+        return frames
+
+    def _send_command(self, comm, priority=None, settle=0.0):
         """
         向LCD发送一个命令。
-        这是通过4位数据模式分两次发送（高4位和低4位）来实现的。
         这是一个内部辅助方法。
 
         :param comm: 要发送的命令字节。
         :type comm: int
+        :param priority: 总线事务优先级，默认使用实例优先级。
+        :type priority: int | None
+        :param settle: 命令的执行时间（秒），大于0时作为屏障写入，期间保持占用总线。
+        :type settle: float
         """
-        # 发送高4位
-        buf = comm & 0xF0
-        buf |= 0x04  # RS=0, RW=0, EN=1
-        self._write_word(buf)
-        time.sleep(0.002)
-        buf &= 0xFB  # EN=0
-        self._write_word(buf)
-
-        # 发送低4位
-        buf = (comm & 0x0F) << 4
-        buf |= 0x04  # RS=0, RW=0, EN=1
-        self._write_word(buf)
-        time.sleep(0.002)
-        buf &= 0xFB  # EN=0
-        self._write_word(buf)
-
-    def _send_data(self, data):
-        """
-        向LCD发送一个字符数据。
-        这是通过4位数据模式分两次发送（高4位和低4位）来实现的。
-        这是一个内部辅助方法。
+        self.device.write(
+            self._encode(comm, 0x00), self._priority(priority), settle=settle
+        )
 
-        :param data: 要发送的字符数据。
-        :type data: int
-        """
-        # 发送高4位
-        buf = data & 0xF0
-        buf |= 0x05  # RS=1, RW=0, EN=1
-        self._write_word(buf)
-        time.sleep(0.002)
-        buf &= 0xFB  # EN=0
-        self._write_word(buf)
-
-        # 发送低4位
-        buf = (data & 0x0F) << 4
-        buf |= 0x05  # RS=1, RW=0, EN=1
-        self._write_word(buf)
-        time.sleep(0.002)
-        buf &= 0xFB  # EN=0
-        self._write_word(buf)
+    def _priority(self, priority):
+        return self.priority if priority is None else priority
 
     def _init_display(self):
-        """执行LCD的初始化序列。"""
-        self._send_command(0x33)  # 初始化到8线模式
-        time.sleep(0.005)
-        self._send_command(0x32)  # 初始化为4线模式
-        time.sleep(0.005)
-        self._send_command(0x28)  # 设置为2行显示, 5x7点阵
-        time.sleep(0.005)
-        self._send_command(0x0C)  # 开启显示, 无光标, 无闪烁
-        time.sleep(0.005)
+        """执行LCD的初始化序列，初始化阶段每4位之间需要等待，因此逐个脉冲发送。"""
+        for comm in (
+            0x33,  # 初始化到8线模式
+            0x32,  # 初始化为4线模式
+            0x28,  # 设置为2行显示, 5x7点阵
+            0x0C,  # 开启显示, 无光标, 无闪烁
+        ):
+            frames = self._encode(comm, 0x00)
+            for i in range(0, len(frames), 2):
+                self.device.write(frames[i : i + 2], self.priority, settle=0.005)
         self.clear()  # 清除显示
 
     def close(self):
-        """关闭I2C总线连接。"""
-        if hasattr(self, "bus"):
-            self.bus.close()
+        """释放I2C总线，最后一个使用者释放后总线才会关闭。"""
+        if getattr(self, "bus", None) is not None:
+            self.bus_manager.release(self.bus)
+            self.bus = None
 
     def __enter__(self):
         """支持 'with' 语句，返回实例本身。"""
@@ -121,10 +122,14 @@ class RpiLcd1602:
         """支持 'with' 语句，退出时自动关闭连接。"""
         self.close()
 
-    def clear(self):
-        """清空屏幕并将光标移至左上角（0, 0）。"""
-        self._send_command(0x01)
-        time.sleep(0.002)  # 清屏命令需要较长时间
+    def clear(self, priority=None):
+        """
+        清空屏幕并将光标移至左上角（0, 0）。
+
+        :param priority: 总线事务优先级，默认使用实例优先级。
+        :type priority: int | None
+        """
+        self._send_command(0x01, priority, settle=0.002)  # 清屏命令需要较长时间
 
     def set_backlight(self, state):
         """
@@ -141,9 +146,9 @@ class RpiLcd1602:
                 display_ctrl |= 0x04  # Display on
             self._send_command(display_ctrl)
 
-    def write(self, x, y, text):
+    def write(self, x, y, text, priority=None):
         """
-        在指定位置写入字符串。
+        在指定位置写入字符串，地址命令和全部字符在一次块传输中写出。
 
         :param x: 列位置 (0-15)。
         :type x: int
@@ -151,6 +156,8 @@ class RpiLcd1602:
         :type y: int
         :param text: 要显示的字符串。
         :type text: str
+        :param priority: 总线事务优先级，默认使用实例优先级。
+        :type priority: int | None
         """
         if not isinstance(text, str):
             text = str(text)
@@ -161,14 +168,14 @@ class RpiLcd1602:
 
         # 计算DDRAM地址
         addr = 0x80 + 0x40 * y + x
-        self._send_command(addr)
-
-        # 逐个字符发送
+        payload = self._encode(addr, 0x00)
         for char in text:
-            self._send_data(ord(char))
+            payload.extend(self._encode(ord(char), 0x01))
+        self.device.write(payload, self._priority(priority))
 
 
 # 程序入口
+# 以模块方式运行: python -m devices.lcd
 if __name__ == "__main__":
     try:
         # 使用 'with' 语句可以确保I2C总线被正确关闭
@@ -8,10 +8,14 @@ MQ-2 传感器可用于检测液化气、丙烷、氢气、酒精、烟雾等多
 :type do_pin: int
 """
 
-from gpiozero import MCP3008, Button
+from gpiozero import Button
 from loguru import logger
 import time
 
+from .adc import mcp3008_decode, mcp3008_frame
+from .bus import BUS_MANAGER
+from .priority import PRIORITY_NORMAL
+
 
 class RpiMq2:
     """
@@ -24,16 +28,37 @@ class RpiMq2:
     :type do_pin: int
     """
 
-    def __init__(self, do_pin: int = 17) -> None:
+    def __init__(
+        self,
+        do_pin: int = 17,
+        channel: int = 0,
+        spi_port: int = 0,
+        chip_select: int = 0,
+        bus_manager=BUS_MANAGER,
+    ) -> None:
         """
         初始化 RpiMq2 实例。
 
+        MCP3008 通过 :class:`BusManager` 共享的 SPI 总线访问，可与其他 SPI 设备共存。
+
         :param do_pin: 连接到传感器数字输出引脚 (DO) 的树莓派 GPIO 引脚号，默认为 17。
         :type do_pin: int
+        :param channel: MCP3008 模拟通道 (0-7)，默认为 0。需要同时读取多路传感器时请使用 :class:`Mcp3008Scanner`。
+        :type channel: int
+        :param spi_port: SPI 端口号，默认为 0。
+        :type spi_port: int
+        :param chip_select: MCP3008 所接的片选，默认为 0 (CE0)。
+        :type chip_select: int
+        :param bus_manager: 总线管理器，默认为进程内共享的管理器。
+        :type bus_manager: BusManager
         """
-        self.adc = MCP3008(channel=0)
+        self.frame = mcp3008_frame(channel)
+        self.channel = channel
+        self.bus_manager = bus_manager
+        self.bus = bus_manager.spi(spi_port)
+        self.adc = self.bus.device(chip_select)
         self.mq2do = Button(do_pin, pull_up=False)
-        logger.info(f"MQ-2 传感器初始化完成。模拟通道: 0, 数字引脚: {do_pin}")
+        logger.info(f"MQ-2 传感器初始化完成。模拟通道: {channel}, 数字引脚: {do_pin}")
 
     def __enter__(self):
         """
@@ -46,11 +71,11 @@ class RpiMq2:
         退出 with 语句时调用，负责清理资源。
         """
         logger.info("正在清理传感器资源...")
-        self.adc.close()
+        self.bus_manager.release(self.bus)
         self.mq2do.close()
         logger.info("传感器资源已清理。")
 
-    def read_analog(self) -> int:
+    def read_analog(self, priority: int = PRIORITY_NORMAL) -> int:
         """
         读取传感器的模拟原始值。
 
@@ -58,14 +83,17 @@ class RpiMq2:
         注意：此值为 ADC 的原始读数 (0-1023)，并非直接的 PPM 浓度值。
         如需精确浓度，需要进行校准和复杂的公式计算。
 
+        :param priority: SPI 总线事务优先级，数值越小越优先。
+        :type priority: int
         :return: 模拟值的原始 ADC 读数 (0-1023)。
         :rtype: int
         """
-        value = self.adc.raw_value
+        value = mcp3008_decode(self.adc.transfer(self.frame, priority))
         logger.info(f"模拟值 (Analog Raw Value): {value}")
         return value
 
 
+# 以模块方式运行: python -m devices.mq
 if __name__ == "__main__":
     logger.info("程序启动，开始监听 MQ-2 传感器...")
     try:
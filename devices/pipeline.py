@@ -0,0 +1,222 @@
+"""
+采样后的数据处理流水线。
+
+主循环和回放引擎共用同一条流水线：每读完一个传感器就用 :meth:`EnvPipeline.feed`
+送入流水线，完成异常检测后立即通知订阅者（如继电器控制引擎）；
+一轮读完后调用 :meth:`EnvPipeline.process` 结束本轮，再做 LCD 显示和数据入库。
+订阅者只会收到通过检测的读数，且在较慢的显示和入库之前收到。
+LCD 和数据库均可为 None，或替换为接口相同的回放替身。
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .anomaly import AnomalyEvent, AnomalyMonitor
+from .priority import PRIORITY_ALARM
+
+# 入库的通道，依次对应 DatabaseManager.insert_env_data 的 temp、humid、ppm
+STORED_CHANNELS = ("ds18_temperature", "humidity", "mq2")
+
+# 发布给订阅者的 anomaly 通道只统计这些通道向上偏离的环境异常（温度升高、烟雾增加），
+# 湿度变化或读数下降不会触发继电器
+ALARM_CHANNELS = ("mq2", "dht_temperature", "ds18_temperature")
+
+# 主循环每轮依次读取的传感器（按读取耗时从短到长），回放时按同样的分组逐组送入流水线
+SENSOR_GROUPS = (("mq2",), ("dht_temperature", "humidity"), ("ds18_temperature",))
+
+
+@dataclass
+class Reading:
+    """一次采样得到的全部读数。
+
+    :param timestamp: 采集时刻的客户端墙上时间（Unix 时间戳，秒，精确到微秒）
+    :param dht_temperature: DHT11 温度（°C）
+    :param humidity: DHT11 湿度（%）
+    :param ds18_temperature: DS18B20 温度（°C）
+    :param mq2: MQ-2 的 ADC 原始读数
+    """
+
+    timestamp: float
+    dht_temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    ds18_temperature: Optional[float] = None
+    mq2: Optional[float] = None
+
+    @classmethod
+    def from_values(
+        cls, timestamp: float, values: dict[str, Optional[float]]
+    ) -> "Reading":
+        """由通道名到读数的映射创建读数，缺少的通道为 None，未知通道被忽略。"""
+        return cls(
+            timestamp,
+            values.get("dht_temperature"),
+            values.get("humidity"),
+            values.get("ds18_temperature"),
+            values.get("mq2"),
+        )
+
+    def values(self) -> dict[str, Optional[float]]:
+        """返回通道名到读数的映射。"""
+        return {
+            "dht_temperature": self.dht_temperature,
+            "humidity": self.humidity,
+            "ds18_temperature": self.ds18_temperature,
+            "mq2": self.mq2,
+        }
+
+
+class EnvPipeline:
+    """环境数据处理流水线。
+
+    使用示例:
+    >>> pipeline = EnvPipeline(AnomalyMonitor(), lcd=lcd, db=db)
+    >>> pipeline.subscribe(ControlEngine(relay).update)
+    >>> pipeline.feed({"mq2": mq2.read_analog()}, clock.time())
+    >>> pipeline.feed({"ds18_temperature": ds18b20.read()}, clock.time())
+    >>> pipeline.process()
+
+    已有整轮读数（如回放数据）时也可以直接处理:
+    >>> pipeline.process(Reading(clock.time(), 24.0, 45.0, 23.8, 120))
+    """
+
+    def __init__(
+        self,
+        monitor: AnomalyMonitor | None = None,
+        lcd=None,
+        db=None,
+    ):
+        """
+        :param monitor: 异常监视器，默认新建 :class:`AnomalyMonitor`
+        :param lcd: LCD 显示器，接口同 :class:`RpiLcd1602`，为 None 时不显示
+        :param db: 数据库，接口同 :class:`DatabaseManager`，为 None 时不入库
+        """
+        self.monitor = monitor or AnomalyMonitor()
+        self.lcd = lcd
+        self.db = db
+        self._subscribers: list[Callable[[dict], None]] = []
+        self._cycle: Optional[dict[str, Optional[float]]] = None
+        self._stamps: dict[str, float] = {}
+
+    def subscribe(self, callback: Callable[[dict], None]) -> None:
+        """
+        订阅通过检测的读数。
+
+        回调参数为本次完成检测的通道读数字典，被判定为故障或读取失败的通道值为 None。
+        每轮结束时的更新额外包含 ``anomaly`` 通道：本轮 :data:`ALARM_CHANNELS`
+        中存在向上偏离的环境异常报警时为 1.0，否则为 0.0。
+
+        :param callback: 回调函数 ``callback(values)``，如 :meth:`ControlEngine.update`
+        """
+        self._subscribers.append(callback)
+
+    def feed(
+        self, values: dict[str, Optional[float]], timestamp: float
+    ) -> dict[str, Optional[float]]:
+        """
+        送入本轮刚读到的一个或几个传感器的读数，检测后立即通知订阅者。
+
+        DHT11 温度需要与同一轮的 DS18B20 交叉校验，在 DS18B20 送入或本轮结束时才会通知。
+
+        :param values: 通道名到读数的映射，读取失败的通道为 None
+        :param timestamp: 这些读数的采集时间（Unix 时间戳，秒）
+        :return: 本次完成检测的读数，故障通道的值为 None
+        """
+        if self._cycle is None:
+            self.monitor.begin()
+            self._cycle = {}
+        self._cycle.update(values)
+        self._stamps.update(dict.fromkeys(values, timestamp))
+        checked = self.monitor.feed(values, timestamp)
+        self._notify(checked)
+        return checked
+
+    def process(self, reading: Reading | None = None) -> list[AnomalyEvent]:
+        """
+        结束一轮采样：完成剩余检测、通知订阅者，然后显示和入库。
+
+        :param reading: 整轮读数，其中尚未通过 :meth:`feed` 送入的通道按
+            ``reading.timestamp`` 补充送入；为 None 时只处理已送入的读数
+        :return: 本轮触发的异常事件
+        """
+        if reading is not None:
+            rest = {
+                channel: value
+                for channel, value in reading.values().items()
+                if self._cycle is None or channel not in self._cycle
+            }
+            if rest:
+                self.feed(rest, reading.timestamp)
+        if self._cycle is None:
+            return []
+
+        update = self.monitor.finish()
+        update["anomaly"] = 1.0 if self._rising_alarm() else 0.0
+        self._notify(update)
+
+        values = self._cycle
+        cleaned = self.monitor.clean(values)
+        timestamp = self._row_timestamp(cleaned)
+        self._cycle = None
+        self._stamps = {}
+
+        if self.lcd is not None:
+            self._display(Reading.from_values(timestamp, values))
+        if self.db is not None:
+            self._store(cleaned, timestamp)
+        return self.monitor.events
+
+    def _row_timestamp(self, cleaned: dict[str, Optional[float]]) -> float:
+        """
+        本轮入库记录的采集时间：取入库通道中有效读数的最晚采集时间。
+
+        各传感器依次读取，DHT11 重试和 DS18B20 出错等待会让同一轮读数相差数秒；
+        取最晚时间使入库的每个读数都不会晚于记录的时间，且读取失败后的等待不计入。
+        """
+        stamps = [
+            self._stamps[channel]
+            for channel in STORED_CHANNELS
+            if cleaned.get(channel) is not None
+        ]
+        return max(stamps or self._stamps.values())
+
+    def _rising_alarm(self) -> bool:
+        """本轮是否存在需要联动继电器的向上偏离的环境异常。"""
+        return any(
+            not event.fault and event.rising and event.channel in ALARM_CHANNELS
+            for event in self.monitor.events
+        )
+
+    def _notify(self, values: dict[str, Optional[float]]) -> None:
+        if values:
+            for callback in self._subscribers:
+                callback(values)
+
+    def _display(self, reading: Reading) -> None:
+        """在LCD1602上显示温湿度和烟雾读数。"""
+        lcd = self.lcd
+        if (
+            reading.dht_temperature is not None
+            and reading.humidity is not None
+            and reading.mq2 is not None
+        ):
+            lcd.clear()
+            # 格式化显示字符串，保留一位小数
+            lcd.write(0, 0, f"T:{reading.dht_temperature:.1f}C")
+            lcd.write(0, 1, f"H:{reading.humidity:.1f}%")
+            lcd.write(8, 0, f"Y:{reading.mq2:.1f}ppm")
+            # 右下角提示: '!' 环境异常（高优先级写入）, 'F' 传感器故障
+            if self.monitor.alarm:
+                lcd.write(15, 1, "!", priority=PRIORITY_ALARM)
+            elif self.monitor.faulted:
+                lcd.write(15, 1, "F")
+        else:
+            lcd.clear()
+            lcd.write(0, 0, "Sensor Read Error")
+            lcd.write(0, 1, "Check DHT11!")
+            lcd.write(8, 0, "X")
+
+    def _store(self, cleaned: dict[str, Optional[float]], timestamp: float) -> None:
+        """插入数据库（以采集时间入库，被判定为故障的通道记为 NULL）。"""
+        values = [cleaned.get(channel) for channel in STORED_CHANNELS]
+        if any(value is not None for value in values):
+            self.db.insert_env_data(*values, timestamp=timestamp)
@@ -0,0 +1,11 @@
+"""
+总线事务优先级常量。
+
+单独成模块、不依赖任何硬件库，流水线等纯逻辑模块可以直接引用，
+无需导入 :mod:`devices.bus`（及其依赖的 smbus、spidev）。
+"""
+
+# 优先级：数值越小越优先
+PRIORITY_ALARM = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BACKGROUND = 20
@@ -0,0 +1,492 @@
+"""
+不依赖传感器硬件的自检程序。
+
+用虚拟时钟、回放替身和记录写入内容的 SMBus 替身检查总线调度、继电器控制和采样调度的关键行为。
+在项目根目录运行: ``python -m devices.selfcheck``
+"""
+
+import threading
+import time
+
+from loguru import logger
+
+from .adc import AdcChannel, Mcp3008Scanner, MqCalibration
+from .anomaly import AnomalyMonitor
+from .bus import I2CBus, PriorityLock, SPIBus
+from .clock import SamplingClock, VirtualClock
+from .control import ControlEngine, Rule, Threshold, default_rules
+from .pipeline import EnvPipeline, Reading
+from .priority import PRIORITY_ALARM, PRIORITY_BACKGROUND, PRIORITY_NORMAL
+from .replay import ReplayEngine, ReplayRelay, synthetic_readings
+
+START = 1_735_660_800.0
+
+
+class _RecordingSMBus:
+    """记录每次块写入内容的 SMBus 替身。"""
+
+    def __init__(self):
+        self.writes: list[list[int]] = []
+
+    def write_byte(self, address, value):
+        self.writes.append([value])
+
+    def write_i2c_block_data(self, address, cmd, data):
+        self.writes.append([cmd, *data])
+
+    def close(self):
+        pass
+
+
+class _SteppedClock(VirtualClock):
+    """墙上时间可以单独跳变（模拟开机后 NTP 校时）的虚拟时钟。"""
+
+    def __init__(self, start: float):
+        super().__init__(start)
+        self.offset = 0.0
+
+    def time(self) -> float:
+        return super().time() + self.offset
+
+
+class _FakeMcp3008:
+    """模拟 MCP3008 的 SpiDev 替身，按通道依次返回预设的转换结果。"""
+
+    def __init__(self, readings: dict[int, list[int]]):
+        self.readings = {ch: iter(values) for ch, values in readings.items()}
+        self.frames: list[list[int]] = []
+
+    def xfer2(self, data):
+        self.frames.append(list(data))
+        value = next(self.readings[(data[1] >> 4) & 0x07])
+        return [0x00, value >> 8, value & 0xFF]
+
+    def close(self):
+        pass
+
+
+class _FakeBusManager:
+    """只提供一条预先构造的 SPI 总线的总线管理器替身。"""
+
+    def __init__(self, bus: SPIBus):
+        self.bus = bus
+        self.released = 0
+
+    def spi(self, port: int = 0) -> SPIBus:
+        return self.bus
+
+    def release(self, bus) -> None:
+        self.released += 1
+
+
+def _start_waiting(target, *args) -> threading.Thread:
+    """启动线程并稍作等待，保证各线程按启动顺序进入排队。"""
+    thread = threading.Thread(target=target, args=args)
+    thread.start()
+    time.sleep(0.05)
+    return thread
+
+
+def check_priority_lock() -> None:
+    """锁被占用期间排队的线程按优先级获得锁，同优先级先来先服务。"""
+    lock = PriorityLock()
+    order = []
+
+    def worker(priority, name):
+        lock.acquire(priority)
+        order.append(name)
+        lock.release()
+
+    lock.acquire()
+    threads = [
+        _start_waiting(worker, PRIORITY_BACKGROUND, "background"),
+        _start_waiting(worker, PRIORITY_NORMAL, "normal-1"),
+        _start_waiting(worker, PRIORITY_NORMAL, "normal-2"),
+        _start_waiting(worker, PRIORITY_ALARM, "alarm"),
+    ]
+    lock.release()
+    for thread in threads:
+        thread.join()
+    assert order == ["alarm", "normal-1", "normal-2", "background"], order
+
+
+def check_priority_lock_interrupted() -> None:
+    """排在队首的等待被中断后撤回排队，后续线程仍能获得锁。"""
+
+    class _Interrupted(Exception):
+        pass
+
+    lock = PriorityLock()
+    wait = lock._cond.wait
+
+    def interrupted_wait(timeout=None):
+        if threading.current_thread().name == "alarm":
+            raise _Interrupted
+        return wait(timeout)
+
+    lock.acquire()
+    lock._cond.wait = interrupted_wait
+    errors = []
+
+    def alarm():
+        try:
+            lock.acquire(PRIORITY_ALARM)
+        except _Interrupted:
+            errors.append("alarm")
+
+    threading.Thread(target=alarm, name="alarm").start()
+    time.sleep(0.05)
+    lock._cond.wait = wait
+    lock.release()
+    acquired = threading.Event()
+
+    def normal():
+        lock.acquire(PRIORITY_NORMAL)
+        acquired.set()
+        lock.release()
+
+    threading.Thread(target=normal, daemon=True).start()
+    assert acquired.wait(1.0), "队首的中断线程未撤回排队"
+    assert errors == ["alarm"], errors
+    assert not lock._queue, lock._queue
+
+
+def check_i2c_coalescing() -> None:
+    """同优先级写入合并到屏障为止，报警写入不与普通写入合并且先发出。"""
+    device = _RecordingSMBus()
+    bus = I2CBus(1, clock=VirtualClock(), smbus_device=device)
+
+    bus.lock.acquire()
+    threads = [
+        _start_waiting(bus.write, 0x27, [0x01], PRIORITY_NORMAL),
+        _start_waiting(bus.write, 0x27, [0x02], PRIORITY_NORMAL, 0.002),
+        _start_waiting(bus.write, 0x27, [0x03], PRIORITY_NORMAL),
+        _start_waiting(bus.write, 0x27, [0x04], PRIORITY_NORMAL),
+        _start_waiting(bus.write, 0x27, [0x09], PRIORITY_ALARM),
+    ]
+    bus.lock.release()
+    for thread in threads:
+        thread.join()
+    assert device.writes == [[0x09], [0x01, 0x02], [0x03, 0x04]], device.writes
+    assert bus.stats.coalesced == 2, bus.stats.coalesced
+    assert bus.clock.monotonic() == 0.002, bus.clock.monotonic()
+
+
+def check_bias_warmup() -> None:
+    """交叉校验偏置取预热期的平均温差，预热期间不做交叉校验。"""
+    monitor = AnomalyMonitor(bias_warmup=10)
+    for i in range(10):
+        diff = 0.5 if i % 2 else 1.5
+        events = monitor.check(
+            {"ds18_temperature": 20.0, "dht_temperature": 20.0 + diff}, START + 2 * i
+        )
+        assert not events, events
+    assert abs(monitor.bias - 1.0) < 1e-9, monitor.bias
+    assert monitor.disagreements == 0
+
+
+def check_cross_check_reject() -> None:
+    """交叉校验判定为故障的 DHT11 读数不进入其 EWMA 统计，也不作为变化率基准。"""
+    monitor = AnomalyMonitor(bias_warmup=10)
+    for i in range(20):
+        monitor.check(
+            {"ds18_temperature": 20.0, "dht_temperature": 21.0}, START + 2 * i
+        )
+    detector = monitor.detectors["dht_temperature"]
+    mean, count, last = detector.mean, detector.count, detector.last_value
+
+    events = monitor.check(
+        {"ds18_temperature": 20.0, "dht_temperature": 25.0}, START + 40
+    )
+    assert [event.kind for event in events] == ["disagree"], events
+    assert monitor.faulted == {"dht_temperature"}
+    assert monitor.clean({"dht_temperature": 25.0}) == {"dht_temperature": None}
+    assert (detector.mean, detector.count, detector.last_value) == (mean, count, last)
+    assert detector.faults == 1
+
+
+def check_bias_relearn() -> None:
+    """连续 relearn_after 次偏差超限后重新学习偏置，之后不再判定故障。"""
+    monitor = AnomalyMonitor(bias_warmup=5, relearn_after=5)
+    for i in range(10):
+        monitor.check(
+            {"ds18_temperature": 20.0, "dht_temperature": 21.0}, START + 2 * i
+        )
+
+    # 传感器移位后真实偏置变为 +5°C
+    t = START + 20
+    for i in range(5):
+        events = monitor.check(
+            {"ds18_temperature": 20.0, "dht_temperature": 25.0}, t + 2 * i
+        )
+        assert [event.kind for event in events] == ["disagree"], events
+    assert monitor.relearns == 1 and monitor.bias is None
+
+    for i in range(5, 20):
+        events = monitor.check(
+            {"ds18_temperature": 20.0, "dht_temperature": 25.0}, t + 2 * i
+        )
+        assert not any(event.fault for event in events), events
+    assert abs(monitor.bias - 5.0) < 1e-9, monitor.bias
+    assert monitor.disagreements == 5
+
+
+def check_mq_calibration() -> None:
+    """参考电压不能高于供电电压；ADC 饱和时得到有限的浓度而不是异常或复数。"""
+    try:
+        MqCalibration(10_000, 1000, -2.2, supply_voltage=3.3, vref=5.0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("vref 高于 supply_voltage 时应抛出 ValueError")
+
+    calibration = MqCalibration(10_000, 1000, -2.2, supply_voltage=5.0, vref=5.0)
+    saturated = calibration(1023)
+    assert isinstance(saturated, float) and 0 < saturated < float("inf"), saturated
+    assert calibration(1023) == calibration(1030)
+    assert calibration(0) == 0.0
+    ppm = [calibration(raw) for raw in (100, 300, 600, 1000)]
+    assert ppm == sorted(ppm), ppm
+
+
+def check_adc_oversampling() -> None:
+    """一次总线事务内扫描全部通道，过采样结果按通道取平均并套用校准。"""
+    adc = _FakeMcp3008({0: [100, 101, 102, 103], 3: [1023], 5: [10, 20]})
+    bus = SPIBus(0, spi_devices={0: adc})
+    manager = _FakeBusManager(bus)
+    channels = [
+        AdcChannel(0, "mq2", oversample=4),
+        AdcChannel(3, "mq135"),
+        AdcChannel(5, "light", oversample=2, calibration=lambda raw: raw / 10),
+    ]
+    with Mcp3008Scanner(channels, bus_manager=manager) as scanner:
+        values = scanner.read()
+    assert values == {"mq2": 101.5, "mq135": 1023.0, "light": 1.5}, values
+    assert all(type(value) is float for value in values.values()), values
+    assert [frame[1] >> 4 & 0x07 for frame in adc.frames] == [0] * 4 + [3] + [5] * 2
+    assert bus.stats.transactions == 1, bus.stats.transactions
+    assert manager.released == 1
+
+
+def check_threshold_hysteresis() -> None:
+    """超过阈值后需回落到滞回下限以下才解除。"""
+    threshold = Threshold(("dht_temperature", "ds18_temperature"), 25.0, hysteresis=0.5)
+    steps = [
+        ({"dht_temperature": 24.0}, False),
+        ({"dht_temperature": 25.2}, True),
+        ({"dht_temperature": 24.8}, True),
+        ({"dht_temperature": 24.4}, False),
+        ({"dht_temperature": 25.0}, False),
+        ({"dht_temperature": 24.0, "ds18_temperature": 25.1}, True),
+        ({}, None),
+    ]
+    for values, expected in steps:
+        result = threshold.evaluate(values)
+        assert result is expected, (values, result)
+
+    heater = Threshold(("ds18_temperature",), 18.0, hysteresis=1.0, below=True)
+    results = [heater.evaluate({"ds18_temperature": v}) for v in (17.5, 18.5, 19.1)]
+    assert results == [True, True, False], results
+
+
+def check_dwell() -> None:
+    """最短开启/关闭保持时间内不切换，到期后下一次更新立即切换。"""
+    clock = VirtualClock(START)
+    relay = ReplayRelay(clock)
+    engine = ControlEngine(
+        relay, default_rules(), clock=clock, min_on=30, min_off=20, stale_after=60
+    )
+
+    assert engine.update({"dht_temperature": 26.0, "anomaly": 0.0})
+    clock.sleep(10)
+    assert engine.update({"dht_temperature": 24.0})
+    assert engine.held_by_dwell == 1
+    clock.sleep(21)
+    assert not engine.update({"dht_temperature": 24.0})
+    clock.sleep(5)
+    assert not engine.update({"dht_temperature": 26.0})
+    clock.sleep(15)
+    assert engine.tick()
+    assert relay.switches == engine.switches == 3, relay.switches
+
+
+def check_fail_safe() -> None:
+    """读数全部过期时进入失效安全状态，恢复更新后按规则判断。"""
+    clock = VirtualClock(START)
+    relay = ReplayRelay(clock)
+    engine = ControlEngine(
+        relay, clock=clock, min_on=0, min_off=0, stale_after=10, fail_safe=True
+    )
+
+    assert not engine.update({"dht_temperature": 20.0, "anomaly": 0.0})
+    clock.sleep(11)
+    assert engine.tick()
+    assert engine.fail_safe_decisions == 1
+    assert not engine.update({"dht_temperature": 20.0, "anomaly": 0.0})
+
+
+def check_wall_clock_step() -> None:
+    """墙上时间向前或向后跳变不影响保持时间和过期判断。"""
+    clock = _SteppedClock(START)
+    relay = ReplayRelay(clock)
+    engine = ControlEngine(relay, clock=clock, min_on=30, min_off=30, fail_safe=True)
+
+    assert engine.update({"dht_temperature": 26.0, "anomaly": 0.0})
+    clock.offset = -3600.0
+    clock.sleep(31)
+    assert not engine.update({"dht_temperature": 24.0, "anomaly": 0.0})
+    clock.offset = 3600.0
+    clock.sleep(1)
+    assert not engine.tick()
+    assert engine.held_by_dwell == 0 and engine.fail_safe_decisions == 0
+
+
+def check_freshness_on_arrival() -> None:
+    """一轮采集被阻塞读取拖长时，读数按到达时刻判断，不会整体过期而进入失效安全状态。"""
+    clock = VirtualClock(START)
+    relay = ReplayRelay(clock)
+    engine = ControlEngine(relay, clock=clock, fail_safe=True)
+    pipeline = EnvPipeline()
+    pipeline.subscribe(engine.update)
+
+    for ds18_wait in (0.0, 12.0, 0.0):  # 第二轮 DS18B20 读取出错后等待 10 秒
+        timestamp = clock.time()
+        pipeline.feed({"mq2": 120.0}, timestamp)
+        clock.sleep(1.0)
+        pipeline.feed({"dht_temperature": 20.0, "humidity": 45.0}, timestamp)
+        clock.sleep(ds18_wait)
+        ds18 = None if ds18_wait else 19.5
+        pipeline.feed({"ds18_temperature": ds18}, timestamp)
+        pipeline.process()
+        clock.sleep(1.0)
+    assert not relay.is_on
+    assert engine.fail_safe_decisions == 0, engine.fail_safe_decisions
+
+
+def check_faulted_reading_not_acted_on() -> None:
+    """被交叉校验判定为故障的 DHT11 读数不会送到控制引擎，也不会留在引擎中。"""
+    engine = ReplayEngine()
+    normal = [Reading(START + 2 * i, 22.0, 45.0, 21.5, 120.0) for i in range(40)]
+    glitch = Reading(START + 80, 40.0, 45.0, 21.5, 120.0)
+    after = [Reading(START + 82 + 2 * i, 22.0, 45.0, 21.5, 120.0) for i in range(40)]
+    report = engine.run([*normal, glitch, *after])
+    assert report.faults >= 1, report
+    assert report.relay_switches == 0, report
+    assert report.relay_held_by_dwell == 0, report
+
+
+def check_anomaly_rule_direction() -> None:
+    """默认规则只因烟雾或温度向上偏离而开启继电器，读数下降只报警不联动。"""
+
+    def replay(mq2_spike: float):
+        readings = [
+            Reading(START + 2 * i, 22.0, 45.0, 21.5, 120.0 + (i % 3)) for i in range(60)
+        ]
+        readings.append(Reading(START + 120, 22.0, 45.0, 21.5, mq2_spike))
+        return ReplayEngine().run(readings)
+
+    falling = replay(20.0)
+    assert falling.alarms >= 1 and falling.relay_switches == 0, falling
+    rising = replay(400.0)
+    assert rising.alarms >= 1 and rising.relay_switches == 1, rising
+
+
+def check_row_timestamp() -> None:
+    """入库时间取有效读数的实际采集时间，不含读取失败后的等待。"""
+    rows = []
+
+    class _Database:
+        def insert_env_data(self, temp=None, humid=None, ppm=None, timestamp=None):
+            rows.append((temp, humid, ppm, timestamp))
+
+    pipeline = EnvPipeline(db=_Database())
+    for ds18, ds18_at in ((21.5, START + 3.0), (None, START + 14.0)):
+        pipeline.feed({"mq2": 120.0}, START)
+        pipeline.feed({"dht_temperature": 22.0, "humidity": 45.0}, START + 2.0)
+        pipeline.feed({"ds18_temperature": ds18}, ds18_at)
+        pipeline.process()
+    assert rows == [
+        (21.5, 45.0, 120.0, START + 3.0),
+        (None, 45.0, 120.0, START + 2.0),
+    ], rows
+
+
+def check_sampling_clock() -> None:
+    """处理超时后跳过错过的采样点并计数，之后恢复按绝对截止时间调度。"""
+    clock = VirtualClock(START)
+    sampler = SamplingClock(2.0, clock)
+    ticks = iter(sampler)
+
+    assert next(ticks) == 0
+    clock.sleep(5.0)  # 处理耗时超过两个周期
+    assert next(ticks) == 3
+    assert clock.monotonic() == 6.0
+    clock.sleep(0.5)
+    assert next(ticks) == 4
+    assert clock.monotonic() == 8.0
+    clock.sleep(2.0)  # 恰好在截止时间完成（如 DHT11 两次 1 秒重试），不算超时
+    assert next(ticks) == 5
+    assert clock.monotonic() == 10.0
+
+    stats = sampler.stats()
+    assert stats["ticks"] == 6, stats
+    assert stats["samples"] == 4, stats
+    assert stats["overruns"] == 1, stats
+    assert stats["skipped"] == 2, stats
+    assert stats["jitter_max"] == 0.0, stats
+
+
+def check_synthetic_replay() -> None:
+    """在设定点附近摆动的合成数据上，滞回和保持时间使继电器切换次数下降一个数量级以上。"""
+    baseline = ReplayEngine(
+        rules=[Rule("overheat", [Threshold(("dht_temperature",), 25.0)])],
+        min_on=0,
+        min_off=0,
+    ).run(synthetic_readings(days=1))
+    tuned = ReplayEngine().run(synthetic_readings(days=1))
+    assert tuned.relay_switches * 10 < baseline.relay_switches, (
+        baseline.relay_switches,
+        tuned.relay_switches,
+    )
+    assert tuned.lcd_refreshes == tuned.samples
+
+
+CHECKS = [
+    check_bias_warmup,
+    check_cross_check_reject,
+    check_bias_relearn,
+    check_priority_lock,
+    check_priority_lock_interrupted,
+    check_i2c_coalescing,
+    check_mq_calibration,
+    check_adc_oversampling,
+    check_threshold_hysteresis,
+    check_dwell,
+    check_fail_safe,
+    check_wall_clock_step,
+    check_freshness_on_arrival,
+    check_faulted_reading_not_acted_on,
+    check_anomaly_rule_direction,
+    check_row_timestamp,
+    check_sampling_clock,
+    check_synthetic_replay,
+]
+
+
+def run_all() -> bool:
+    """依次运行全部自检，返回是否全部通过。"""
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"{check.__name__} 失败: {e}")
+        else:
+            logger.success(f"{check.__name__} 通过")
+    logger.info(f"自检完成: {len(CHECKS) - failed}/{len(CHECKS)} 项通过")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if run_all() else 1)
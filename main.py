@@ -1,10 +1,21 @@
-import time
 import board
 from loguru import logger
 from dotenv import load_dotenv
 import os
 
-from devices import DatabaseManager, RpiRelay, RpiDht11, RpiDs18b20, RpiLcd1602, RpiMq2
+from devices import (
+    SYSTEM_CLOCK,
+    AnomalyMonitor,
+    ControlEngine,
+    DatabaseManager,
+    EnvPipeline,
+    RpiRelay,
+    RpiDht11,
+    RpiDs18b20,
+    RpiLcd1602,
+    RpiMq2,
+    SamplingClock,
+)
 
 
 # 加载环境变量
@@ -19,64 +30,49 @@ DB_CONFIG = {
 }
 
 
-def main():
-    # 初始化数据库
+def main(clock=SYSTEM_CLOCK):
+    # 初始化数据库（同时将旧表的 timestamp 列升级为微秒精度）
     db = DatabaseManager(**DB_CONFIG)
+    db.initialize()
 
     # 初始化传感器和继电器
     with (
-        RpiDht11(board.D23) as dht11,
-        RpiDs18b20() as ds18b20,
+        RpiDht11(board.D23, clock=clock) as dht11,
+        RpiDs18b20(clock=clock) as ds18b20,
         RpiRelay(24) as relay,
         RpiLcd1602() as lcd,
         RpiMq2() as mq2,
     ):
+        # 异常检测、LCD显示和入库由流水线统一处理
+        pipeline = EnvPipeline(AnomalyMonitor(), lcd=lcd, db=db)
+        # 继电器由控制引擎根据规则驱动（默认规则见 default_rules）。
+        # 每个传感器读完即送入流水线，通过异常检测的读数立即交给引擎评估
+        control = ControlEngine(relay, clock=clock)
+        pipeline.subscribe(control.update)
+        # 每2秒采样一次，按绝对截止时间调度，处理耗时不会累积成周期漂移
+        sampler = SamplingClock(2.0, clock)
         try:
-            while True:
-                # 读取温湿度数据
+            for tick in sampler:
+                # 按读取耗时从短到长依次读取（见 SENSOR_GROUPS），DS18B20 出错时会阻塞等待。
+                # 每个读数都以读完时的时刻作为采集时间
+                mq2_value = mq2.read_analog()
+                pipeline.feed({"mq2": mq2_value}, clock.time())
                 dht_temperature, humidity = dht11.read()
+                pipeline.feed(
+                    {"dht_temperature": dht_temperature, "humidity": humidity},
+                    clock.time(),
+                )
                 ds18_temperature = ds18b20.read()
-                mq2_value = mq2.read_analog()
-                # 在LCD1602上显示温湿度
-                if (
-                    dht_temperature is not None
-                    and humidity is not None
-                    and mq2_value is not None
-                ):
-                    lcd.clear()
-                    # 格式化显示字符串，保留一位小数
-                    temp_str = f"T:{dht_temperature:.1f}C"
-                    humi_str = f"H:{humidity:.1f}%"
-                    mp2_str = f"Y:{mq2_value:.1f}ppm"
-                    lcd.write(0, 0, temp_str)
-                    lcd.write(0, 1, humi_str)
-                    lcd.write(8, 0, mp2_str)
-                else:
-                    lcd.clear()
-                    lcd.write(0, 0, "Sensor Read Error")
-                    lcd.write(0, 1, "Check DHT11!")
-                    lcd.write(8, 0, "X")
-
-                # 插入数据库
-                if (
-                    ds18_temperature is not None
-                    and humidity is not None
-                    and mq2_value is not None
-                ):
-                    db.insert_env_data(ds18_temperature, humidity, mq2_value)
-
-                # 根据温度控制继电器（示例逻辑：温度高于25度时开启继电器）
-                if dht_temperature is not None:
-                    if dht_temperature > 25:
-                        relay.on()
-                    else:
-                        relay.off()
+                pipeline.feed({"ds18_temperature": ds18_temperature}, clock.time())
+                # 结束本轮：完成剩余检测，然后显示和入库
+                pipeline.process()
 
-                # 等待2秒后继续下一次读取
-                time.sleep(2)
+                if tick and tick % 300 == 0:
+                    logger.info(f"采样调度统计: {sampler.stats()}")
+                    logger.info(f"继电器控制统计: {control.stats()}")
 
         except KeyboardInterrupt:
-            logger.info("用户终止程序")
+            logger.info(f"用户终止程序，采样调度统计: {sampler.stats()}")
         except Exception as e:
             logger.exception(f"运行时出错: {e}")
 